@@ -8,7 +8,10 @@ import os
 import time
 import random
 import logging
-from datetime import datetime, timedelta
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 from urllib.parse import urlparse, parse_qs
 
 # anthropic 라이브러리 임포트
@@ -112,6 +115,19 @@ def add_emoji_animation():
 claude_api_key = st.secrets["ANTHROPIC_API_KEY"]
 youtube_api_key = st.secrets["YOUTUBE_API_KEY"]
 
+# 우리 채널 ID
+CHANNEL_ID = "UCTHCOPwqNfZ0uiKOvFyhGwg"
+
+# 새 업로드 사전 처리(prefetch) 설정 - secrets에서 덮어쓸 수 있습니다.
+PREFETCH_ENABLED = str(st.secrets.get("PREFETCH_ENABLED", "false")).strip().lower() in ("1", "true", "yes", "on")  # 기본값 꺼짐
+PREFETCH_POLL_INTERVAL = int(st.secrets.get("PREFETCH_POLL_INTERVAL", 300))  # 채널 확인 주기 (초)
+PREFETCH_DAILY_QUOTA = int(st.secrets.get("PREFETCH_DAILY_QUOTA", 500))  # 하루 YouTube API 사용 한도 (units, 태평양 시간 자정 초기화)
+PREFETCH_MAX_VIDEOS_PER_DAY = int(st.secrets.get("PREFETCH_MAX_VIDEOS_PER_DAY", 10))  # 하루 Claude 사전 처리 영상 수 한도
+PREFETCH_LOOKBACK_HOURS = int(st.secrets.get("PREFETCH_LOOKBACK_HOURS", 24))  # 사전 처리 대상 업로드 범위 (시간)
+PREFETCH_MAX_CACHED = int(st.secrets.get("PREFETCH_MAX_CACHED", 50))  # 보관할 결과 수
+PREFETCH_TRANSCRIPT_RETRIES = int(st.secrets.get("PREFETCH_TRANSCRIPT_RETRIES", 6))  # 자막이 아직 없을 때 재시도 횟수
+PREFETCH_RETRY_DELAY = int(st.secrets.get("PREFETCH_RETRY_DELAY", 600))  # 자막 재시도 간격 (초)
+
 def get_video_id(url):
     logger.debug(f"URL 파싱 시도: {url}")
     if "youtu.be" in url:
@@ -243,7 +259,7 @@ def chunk_transcript(transcript, chunk_size=3000):
 
 from anthropic import Anthropic, HUMAN_PROMPT, AI_PROMPT
 
-def generate_content_safely(client, prompt, max_retries=3):
+def generate_content_safely(client, prompt, max_retries=3, show_ui=True):
     for attempt in range(max_retries):
         try:
             time.sleep(2)  # API 호출 사이에 2초 대기
@@ -261,26 +277,28 @@ def generate_content_safely(client, prompt, max_retries=3):
             logger.exception(f"Anthropic API 오류 (시도 {attempt + 1}/{max_retries}): {str(e)}")
             if attempt < max_retries - 1:
                 logger.warning(f"재시도 중... (시도 {attempt + 1}/{max_retries})")
-                st.warning(f"재시도 중... (시도 {attempt + 1}/{max_retries})")
+                if show_ui:
+                    st.warning(f"재시도 중... (시도 {attempt + 1}/{max_retries})")
                 time.sleep(5)  # 오류 발생 시 5초 대기 후 재시도
             else:
                 logger.error(f"콘텐츠 생성 중 오류 발생: {str(e)}")
-                st.error(f"콘텐츠 생성 중 오류 발생: {str(e)}")
+                if show_ui:
+                    st.error(f"콘텐츠 생성 중 오류 발생: {str(e)}")
                 return None
     return None
 
-def summarize_long_transcript(client, transcript):
+def summarize_long_transcript(client, transcript, show_ui=True):
     chunks = chunk_transcript(transcript)
     summaries = []
     for chunk in chunks:
         summary_prompt = f"다음 텍스트를 1-2문장으로 요약해주세요:\n\n{chunk[:1000]}"
-        summary = generate_content_safely(client, summary_prompt)
+        summary = generate_content_safely(client, summary_prompt, show_ui=show_ui)
         if summary:
             summaries.append(summary)
     
     if summaries:
         final_summary_prompt = f"다음은 긴 영상의 부분 요약들입니다. 이를 바탕으로 전체 내용을 3줄로 요약해주세요:\n\n{' '.join(summaries)[:2000]}"
-        final_summary = generate_content_safely(client, final_summary_prompt)
+        final_summary = generate_content_safely(client, final_summary_prompt, show_ui=show_ui)
         return final_summary
     return None
 
@@ -324,14 +342,14 @@ def get_channel_videos(youtube, channel_id, max_results=50):
 
     return videos
 
-def generate_content(client, summary, original_title, original_description, channel_videos):
+def generate_content(client, summary, original_title, original_description, channel_videos, show_ui=True):
     # 채널 영상 정보 정리
     top_videos = sorted(channel_videos, key=lambda x: x[1], reverse=True)[:10]
     video_info = "\n".join([f"- {title} (조회수: {views:,})" for title, views in top_videos])
 
     # 요약 생성
     summary_prompt = f"다음 YouTube 영상 요약을 5개의 주요 포인트로 나누어 설명해주세요. 각 포인트는 하나의 문장으로 작성하고, 적절한 이모지를 문장 시작에 추가해주세요. 번호는 붙이지 마세요:\n\n{summary}"
-    summary_result = generate_content_safely(client, summary_prompt)
+    summary_result = generate_content_safely(client, summary_prompt, show_ui=show_ui)
 
     # 타이틀 생성
     categories = ["흥미유발", "정보성", "문제제기", "드라마틱", "전문성"]
@@ -345,7 +363,7 @@ def generate_content(client, summary, original_title, original_description, chan
                        f"- 다음은 우리 채널의 인기 있는 영상 제목과 조회수입니다. 이를 참고하여 비슷한 스타일로 제목을 생성해주세요:\n" \
                        f"{video_info}\n\n" \
                        f"원래 제목: '{original_title}'\n\n{summary}"
-        title = generate_content_safely(client, title_prompt)
+        title = generate_content_safely(client, title_prompt, show_ui=show_ui)
         titles.append(title.strip() if title else f"({category} 제안 없음)")
 
     # 밈을 활용한 제목 생성
@@ -357,7 +375,7 @@ def generate_content(client, summary, original_title, original_description, chan
                         f"- 각 제목은 새로운 줄에 작성하고, 번호를 붙이지 마세요.\n" \
                         f"- 다음은 우리 채널의 인기 있는 영상 제목과 조회수입니다. 이를 참고하여 비슷한 스타일로 제목을 생성해주세요:\n" \
                         f"{video_info}\n\n{summary}"
-    meme_titles = generate_content_safely(client, meme_title_prompt)
+    meme_titles = generate_content_safely(client, meme_title_prompt, show_ui=show_ui)
     if meme_titles:
         meme_titles = [title.strip() for title in meme_titles.split('\n') if title.strip()]
     titles.extend(meme_titles[:3])  # 최대 3개의 밈 제목만 사용
@@ -368,7 +386,7 @@ def generate_content(client, summary, original_title, original_description, chan
 
     # 설명 생성
     description_prompt = f"다음 YouTube 영상 요약을 바탕으로 2개의 흥미로운 설명을 생성해주세요. 각 설명에 적절한 이모지를 섞어 친절하고 귀엽게, 센스있게 구성해주세요. 번호는 붙이지 마세요. 원래 설명 참고: '{original_description[:200]}'\n\n{summary}"
-    descriptions = generate_content_safely(client, description_prompt)
+    descriptions = generate_content_safely(client, description_prompt, show_ui=show_ui)
 
     # 해시태그 생성
     hashtag_prompt = f"다음 YouTube 영상 요약을 바탕으로 관련 해시태그를 생성해주세요.\n" \
@@ -376,7 +394,7 @@ def generate_content(client, summary, original_title, original_description, chan
                      f"이 4개를 제외하고 추가로 10개의 관련 해시태그를 생성해주세요.\n" \
                      f"각 해시태그는 '#'로 시작하고 띄어쓰기 없이 작성해주세요.\n" \
                      f"총 14개의 해시태그가 되어야 합니다:\n\n{summary}"
-    hashtags = generate_content_safely(client, hashtag_prompt)
+    hashtags = generate_content_safely(client, hashtag_prompt, show_ui=show_ui)
 
     # 퀴즈 생성
     def generate_quizzes(max_attempts=3):
@@ -387,7 +405,7 @@ def generate_content(client, summary, original_title, original_description, chan
                           f"b) 오답1\n" \
                           f"c) 오답2\n\n" \
                           f"반드시 3개의 퀴즈를 생성해야 하며, 각 퀴즈는 질문과 3개의 선택지를 포함해야 합니다. 퀴즈 사이에는 빈 줄을 넣어주세요.\n\n{summary}"
-            quizzes = generate_content_safely(client, quiz_prompt)
+            quizzes = generate_content_safely(client, quiz_prompt, show_ui=show_ui)
 
             parsed_quizzes = []
             if quizzes:
@@ -462,6 +480,245 @@ def display_results(content):
             st.markdown("퀴즈 생성에 실패했습니다.")
         st.markdown("")  # 퀴즈 간 공백 추가
 
+class ChannelPrefetcher:
+    """채널의 새 업로드를 주기적으로 확인하고, 결과를 미리 생성해 두는 백그라운드 작업."""
+
+    # YouTube Data API 호출별 quota 비용 (units)
+    CHANNELS_LIST_COST = 1
+    PLAYLIST_ITEMS_LIST_COST = 1
+
+    # YouTube API quota는 태평양 시간 자정에 초기화됩니다.
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+
+    # 캐시에 저장하기 전에 반드시 값이 있어야 하는 항목
+    REQUIRED_FIELDS = ["요약", "타이틀 제안", "디스크립션", "해시태그", "콘텐츠 피드백 (퀴즈)"]
+
+    @classmethod
+    def is_complete(cls, content):
+        """빈 항목이나 생성 실패 표시("제안 없음", 퀴즈 "N/A")가 없는 결과인지 확인합니다."""
+        if any(not content.get(field) for field in cls.REQUIRED_FIELDS):
+            return False
+        if any(not title or title.endswith("제안 없음)") for title in content["타이틀 제안"]):
+            return False
+        return all(quiz["options"][0] != "N/A" for quiz in content["콘텐츠 피드백 (퀴즈)"])
+
+    def __init__(self, claude_api_key, youtube_api_key, channel_id,
+                 poll_interval=PREFETCH_POLL_INTERVAL,
+                 daily_quota=PREFETCH_DAILY_QUOTA,
+                 max_videos_per_day=PREFETCH_MAX_VIDEOS_PER_DAY,
+                 lookback_hours=PREFETCH_LOOKBACK_HOURS,
+                 max_cached=PREFETCH_MAX_CACHED,
+                 transcript_retries=PREFETCH_TRANSCRIPT_RETRIES,
+                 retry_delay=PREFETCH_RETRY_DELAY):
+        self.claude_api_key = claude_api_key
+        self.youtube_api_key = youtube_api_key
+        self.channel_id = channel_id
+        self.poll_interval = poll_interval
+        self.daily_quota = daily_quota
+        self.max_videos_per_day = max_videos_per_day
+        self.lookback_hours = lookback_hours
+        self.max_cached = max_cached
+        self.transcript_retries = transcript_retries
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._results = OrderedDict()  # video_id -> generate_content 결과
+        self._seen = set()
+        self._queue = []  # {"video_id", "title", "description", "published_at", "attempts", "next_try_at"}
+        self._uploads_playlist_id = None
+        self._quota_date = None
+        self._quota_used = 0
+        self._videos_processed = 0
+
+    @staticmethod
+    def stop_running():
+        # 코드 변경으로 cache_resource가 새 인스턴스를 만들 때 이전 스레드를 정리
+        for thread in threading.enumerate():
+            prefetcher = getattr(thread, "prefetcher", None)
+            if prefetcher is not None:
+                prefetcher.stop()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="channel-prefetcher", daemon=True)
+        self._thread.prefetcher = self
+        self._thread.start()
+        logger.info(f"채널 사전 처리 시작: {self.channel_id} (주기 {self.poll_interval}초)")
+
+    def stop(self):
+        self._stop_event.set()
+
+    def get(self, video_id):
+        with self._lock:
+            return self._results.get(video_id)
+
+    def discard(self, video_id):
+        with self._lock:
+            self._results.pop(video_id, None)
+
+    def _reset_daily_budget(self):
+        today = datetime.now(self.QUOTA_TIMEZONE).date()
+        if self._quota_date != today:
+            self._quota_date = today
+            self._quota_used = 0
+            self._videos_processed = 0
+
+    def _spend_quota(self, cost):
+        self._reset_daily_budget()
+        if self._quota_used + cost > self.daily_quota:
+            logger.warning(f"사전 처리 YouTube API 일일 한도 초과: {self._quota_used}/{self.daily_quota}")
+            return False
+        self._quota_used += cost
+        return True
+
+    def _lookback_cutoff(self):
+        return datetime.now(timezone.utc) - timedelta(hours=self.lookback_hours)
+
+    def _get_uploads_playlist_id(self, youtube):
+        if self._uploads_playlist_id is None:
+            if not self._spend_quota(self.CHANNELS_LIST_COST):
+                return None
+            response = youtube.channels().list(part="contentDetails", id=self.channel_id).execute()
+            items = response.get("items", [])
+            if not items:
+                logger.warning(f"채널 정보를 찾을 수 없습니다: {self.channel_id}")
+                return None
+            self._uploads_playlist_id = items[0]["contentDetails"]["relatedPlaylists"]["uploads"]
+        return self._uploads_playlist_id
+
+    def poll(self, youtube):
+        """업로드 목록을 확인해 최근 새 영상을 대기열에 추가합니다."""
+        playlist_id = self._get_uploads_playlist_id(youtube)
+        if playlist_id is None or not self._spend_quota(self.PLAYLIST_ITEMS_LIST_COST):
+            return
+
+        response = youtube.playlistItems().list(part="snippet,contentDetails", playlistId=playlist_id, maxResults=10).execute()
+        cutoff = self._lookback_cutoff()
+
+        for item in response.get("items", []):
+            snippet = item["snippet"]
+            video_id = snippet["resourceId"]["videoId"]
+            if video_id in self._seen:
+                continue
+
+            # 예약/프리미어 영상은 공개된 뒤에야 videoPublishedAt이 생기므로 다음 확인 때 다시 봄
+            video_published_at = item.get("contentDetails", {}).get("videoPublishedAt")
+            if not video_published_at:
+                continue
+            self._seen.add(video_id)
+
+            # 공개 시각이 lookback 범위보다 오래된 영상은 처리하지 않음
+            published_at = datetime.fromisoformat(video_published_at.replace("Z", "+00:00"))
+            if published_at < cutoff:
+                continue
+
+            logger.info(f"새 업로드 대기열 추가: {video_id} ({snippet['title']})")
+            self._queue.append({
+                "video_id": video_id,
+                "title": snippet["title"],
+                "description": snippet.get("description", ""),
+                "published_at": published_at,
+                "attempts": 0,
+                "next_try_at": published_at,
+            })
+
+    def _next_ready(self):
+        # 오래된 항목은 버리고, 처리 가능한 항목 중 가장 최근 업로드부터 반환
+        cutoff = self._lookback_cutoff()
+        self._queue = [entry for entry in self._queue if entry["published_at"] >= cutoff]
+        now = datetime.now(timezone.utc)
+        ready = [entry for entry in self._queue if entry["next_try_at"] <= now]
+        if not ready:
+            return None
+        return max(ready, key=lambda entry: entry["published_at"])
+
+    def fetch_transcript(self, video_id):
+        # captions.download는 영상 소유자 OAuth가 필요해 API 키만으로는 성공할 수 없으므로
+        # get_captions_from_youtube_api 대체 경로는 사용하지 않음 (quota만 소모)
+        return get_youtube_transcript(f"https://www.youtube.com/watch?v={video_id}")
+
+    def process(self, claude_client, youtube, video_id, transcript, original_title, original_description):
+        """요약 → 콘텐츠 생성을 미리 실행하고, 생성 실패 항목이 없는 결과만 저장합니다."""
+        channel_videos = get_channel_videos(youtube, self.channel_id)
+        summary = summarize_long_transcript(claude_client, transcript, show_ui=False)
+        if not summary:
+            logger.warning(f"사전 처리: 요약을 생성하지 못했습니다: {video_id}")
+            return None
+
+        content = generate_content(claude_client, summary, original_title, original_description, channel_videos, show_ui=False)
+        if not self.is_complete(content):
+            logger.warning(f"사전 처리: 결과에 생성 실패 항목이 있어 저장하지 않습니다: {video_id}")
+            return None
+
+        with self._lock:
+            self._results[video_id] = content
+            while len(self._results) > self.max_cached:
+                self._results.popitem(last=False)
+        logger.info(f"사전 처리 완료: {video_id}")
+        return content
+
+    def _process_queue(self, claude_client, youtube):
+        while not self._stop_event.is_set():
+            entry = self._next_ready()
+            if entry is None:
+                return
+            self._reset_daily_budget()
+            if self._videos_processed >= self.max_videos_per_day:
+                logger.warning(f"사전 처리 일일 영상 수 한도 도달: {self.max_videos_per_day}")
+                return
+            self._queue.remove(entry)
+            video_id = entry["video_id"]
+
+            try:
+                transcript = self.fetch_transcript(video_id)
+            except Exception as e:
+                logger.exception(f"사전 처리 자막 가져오기 실패: {video_id}: {str(e)}")
+                transcript = None
+
+            # 업로드 직후에는 자동 생성 자막이 아직 없는 경우가 많으므로 나중에 다시 시도
+            if not transcript or len(transcript.strip()) < 10:
+                entry["attempts"] += 1
+                if entry["attempts"] > self.transcript_retries:
+                    logger.warning(f"사전 처리: 자막 재시도 한도 초과, 건너뜁니다: {video_id}")
+                    continue
+                entry["next_try_at"] = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay)
+                self._queue.append(entry)
+                logger.info(f"사전 처리: 자막이 아직 없습니다. {self.retry_delay}초 후 재시도 ({entry['attempts']}/{self.transcript_retries}): {video_id}")
+                continue
+
+            # Claude 호출 단계에 도달한 영상만 일일 한도에 포함
+            self._videos_processed += 1
+            try:
+                self.process(claude_client, youtube, video_id, transcript, entry["title"], entry["description"])
+            except Exception as e:
+                logger.exception(f"사전 처리 실패: {video_id}: {str(e)}")
+
+    def _run(self):
+        # 백그라운드 스레드 전용 클라이언트 (googleapiclient 객체는 스레드 간 공유하지 않음)
+        claude_client = Anthropic(api_key=self.claude_api_key)
+        youtube = build('youtube', 'v3', developerKey=self.youtube_api_key)
+
+        while not self._stop_event.is_set():
+            try:
+                self.poll(youtube)
+            except Exception as e:
+                logger.exception(f"채널 업로드 확인 실패: {str(e)}")
+
+            self._process_queue(claude_client, youtube)
+            self._stop_event.wait(self.poll_interval)
+
+@st.cache_resource
+def get_prefetcher(claude_api_key, youtube_api_key, channel_id):
+    # 세션/재실행과 관계없이 프로세스당 하나의 prefetcher만 실행
+    ChannelPrefetcher.stop_running()
+    prefetcher = ChannelPrefetcher(claude_api_key, youtube_api_key, channel_id)
+    prefetcher.start()
+    return prefetcher
+
 def main():
     st.title("👽MZ외계인👽이 도와주는 YouTube 영상 발행 준비")
     st.markdown("""
@@ -495,9 +752,15 @@ def main():
         st.error(f"API 설정 중 오류가 발생했습니다: {str(e)}")
         return
 
+    prefetcher = get_prefetcher(claude_api_key, youtube_api_key, CHANNEL_ID) if PREFETCH_ENABLED else None
+
     st.header("📺 영상 정보 입력")
     youtube_url = st.text_input("YouTube 영상 URL을 입력하세요:", placeholder="https://www.youtube.com/watch?v=...")
 
+    regenerate = False
+    if prefetcher:
+        regenerate = st.checkbox("미리 생성된 결과 대신 새로 생성하기", key="regenerate_checkbox")
+
     if not youtube_url:
         emoji_placeholder.markdown(add_emoji_animation(), unsafe_allow_html=True)
 
@@ -509,6 +772,24 @@ def main():
                 st.error("올바른 YouTube URL을 입력해주세요.")
                 return
 
+            # 미리 생성된 결과가 있으면 바로 표시 (새로 생성을 선택하면 버리고 다시 생성)
+            if prefetcher and regenerate:
+                prefetcher.discard(video_id)
+            prefetched = prefetcher.get(video_id) if prefetcher else None
+            if prefetched:
+                logger.info(f"사전 처리된 결과 사용: {video_id}")
+                prefetched_placeholder = st.empty()
+                try:
+                    with prefetched_placeholder.container():
+                        st.success("미리 생성된 콘텐츠를 불러왔습니다!")
+                        display_results(prefetched)
+                    return
+                except Exception as e:
+                    # 미리 생성된 결과를 표시할 수 없으면 지우고 새로 생성
+                    logger.exception(f"사전 처리된 결과 표시 실패, 새로 생성합니다: {video_id}: {str(e)}")
+                    prefetched_placeholder.empty()
+                    prefetcher.discard(video_id)
+
             progress_bar = st.progress(0)
             status_text = st.empty()
 
@@ -555,8 +836,7 @@ def main():
                 # 채널 영상 정보 가져오기
                 status_text.text("채널 영상 정보를 분석하는 중...")
                 progress_bar.progress(60)
-                channel_id = "UCTHCOPwqNfZ0uiKOvFyhGwg"
-                channel_videos = get_channel_videos(youtube, channel_id)
+                channel_videos = get_channel_videos(youtube, CHANNEL_ID)
 
                 logger.info(f"채널 영상 정보: {channel_videos}")
 